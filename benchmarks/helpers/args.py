@@ -1,28 +1,83 @@
+from __future__ import annotations
+
 import argparse
+from typing import TYPE_CHECKING, Tuple
+
+from .stats import CACHE_MODES
 
-from omfiles.types import BasicSelection
+if TYPE_CHECKING:
+    from omfiles.types import BasicSelection
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Benchmark different file formats")
-    parser.add_argument("--array-size", type=tuple, default=(10, 10, 1, 10, 10, 10), help="Size of the test array")
-    parser.add_argument("--chunk-size", type=tuple, default=(10, 5, 1, 1, 1, 1), help="Chunk size for writing data")
+    parser.add_argument("--array-size", type=parse_shape, default=(10, 10, 1, 10, 10, 10), help="Size of the test array")
+    parser.add_argument("--chunk-size", type=parse_shape, default=(10, 5, 1, 1, 1, 1), help="Chunk size for writing data")
     parser.add_argument("--read-index", type=parse_tuple, default=(0, 0, 0, 0, ...), help="Index for reading")
-    parser.add_argument("--iterations", type=int, default=5, help="Number of iterations for each test")
-    return parser.parse_args()
+    parser.add_argument("--iterations", type=int, default=20, help="Number of samples for each test")
+    parser.add_argument("--warmup", type=int, default=1, help="Number of discarded warmup runs before each test")
+    parser.add_argument(
+        "--cache-mode",
+        nargs="+",
+        choices=CACHE_MODES,
+        default=["warm"],
+        help="Page cache states to benchmark reads with: warm, cold (dropped before every read) or mixed",
+    )
+    parser.add_argument("--int16", action="store_true", help="Also benchmark writes of data prequantized to int16")
+    parser.add_argument("--parallel", action="store_true", help="Run the write benchmarks of all formats in parallel processes")
+    parser.add_argument(
+        "--isolate", action="store_true", help="Benchmark each format in a fresh process, one after the other"
+    )
+    parser.add_argument("--cpu-pin", type=int, default=None, help="Pin the process to this CPU while measuring")
+    parser.add_argument("--no-chunk-cache", action="store_true", help="Disable the netCDF chunk cache for reads")
+    parser.add_argument(
+        "--prefetch", action="store_true", help="Also benchmark reads that pick up a prefetched read, for readers that support it"
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="Also trace the Python heap peak with tracemalloc (slow)"
+    )
+    parser.add_argument("--memmap", action="store_true", help="Back the generated test data with a memory-mapped file")
+    args = parser.parse_args()
+
+    if len(args.array_size) != len(args.chunk_size):
+        parser.error(
+            f"--array-size {args.array_size} and --chunk-size {args.chunk_size} must have the same number of dimensions"
+        )
+    return args
 
 
 def parse_tuple(string: str) -> BasicSelection:
-    # Remove parentheses and split by comma
-    items = string.strip("()").split(",")
-    # Convert each item to the appropriate type
+    # Single pass over the string: find the comma separated items between the
+    # (optional) parentheses by index arithmetic instead of building split lists
     result = []
-    for item in items:
-        item = item.strip()
+    start, end = 0, len(string)
+    while start < end and string[start] in "()":
+        start += 1
+    while end > start and string[end - 1] in "()":
+        end -= 1
+
+    while start <= end:
+        comma = string.find(",", start, end)
+        if comma < 0:
+            comma = end
+        item = string[start:comma].strip()
+        # Convert each item to the appropriate type
         if item == "...":
             result.append(Ellipsis)
         elif item.lower() == "none":
             result.append(None)
         elif item:  # Skip empty strings from trailing commas
             result.append(int(item))
+        start = comma + 1
     return tuple(result)
+
+
+def parse_shape(string: str) -> Tuple[int, ...]:
+    # A shape is a tuple of positive integers, e.g. "100,100" or "(100, 100)"
+    try:
+        shape = parse_tuple(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shape: {string!r}")
+    if not isinstance(shape, tuple) or not shape or not all(isinstance(s, int) and s > 0 for s in shape):
+        raise argparse.ArgumentTypeError(f"Shape must be a tuple of positive integers, got {string!r}")
+    return shape
@@ -1,11 +1,13 @@
 from .io.readers import (
     BaseReader,
     HDF5HidefixReader,
+    HDF5ParallelReader,
     HDF5Reader,
     NetCDFReader,
     OMReader,
     TensorStoreZarrReader,
     ZarrReader,
+    ZarrsCodecsZarrReader,
 )
 from .io.writers import BaseWriter, HDF5Writer, NetCDFWriter, OMWriter, ZarrWriter
 
@@ -22,8 +24,10 @@ class FormatFactory:
     readers = {
         "h5": HDF5Reader,
         "h5hidefix": HDF5HidefixReader,
+        "h5parallel": HDF5ParallelReader,
         "zarr": ZarrReader,
         "zarrTensorStore": TensorStoreZarrReader,
+        "zarrZarrs": ZarrsCodecsZarrReader,
         "nc": NetCDFReader,
         "om": OMReader
     }
@@ -35,7 +39,7 @@ class FormatFactory:
         return cls.writers[format_name](filename)
 
     @classmethod
-    def create_reader(cls, format_name: str, filename: str) -> BaseReader:
+    def create_reader(cls, format_name: str, filename: str, **options) -> BaseReader:
         if format_name not in cls.readers:
             raise ValueError(f"Unknown format: {format_name}")
-        return cls.readers[format_name](filename)
+        return cls.readers[format_name](filename, **options)
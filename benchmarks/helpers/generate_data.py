@@ -1,19 +1,95 @@
+from functools import lru_cache
+
 import numpy as np
 
 
-def generate_test_data(array_size, noise_level=5, amplitude=20, offset=20):
+@lru_cache(maxsize=None)
+def _noisy_rows_kernel():
+    """Return the parallel numba kernel that fills noisy rows, or None without numba.
+
+    numba is imported on first use only, so processes that never generate data,
+    like the isolated benchmark workers, do not pay its import time.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:  # numba is optional, fall back to the NumPy implementation
+        return None
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _fill_noisy_rows(out, base, noise_level):
+        for i in prange(out.shape[0]):
+            for j in range(out.shape[1]):
+                out[i, j] = base[j] + noise_level * np.random.standard_normal()
+
+    return _fill_noisy_rows
+
+
+@lru_cache(maxsize=8)
+def _sinusoid_base(n, amplitude, offset):
+    """Return the read-only float32 sinusoid of length n, cached across calls."""
+    x = np.linspace(0, 2 * np.pi * (n / 100), n, dtype=np.float32)
+    base = (amplitude * np.sin(x) + offset).astype(np.float32, copy=False)
+    base.flags.writeable = False
+    return base
+
+
+def quantize_int16(data, scale, offset):
+    """Quantize float data to int16 via (data - offset) / scale, clipped to the int16 range."""
+    quantized = np.subtract(data, np.float32(offset), dtype=np.float32)
+    np.divide(quantized, np.float32(scale), out=quantized)
+    np.rint(quantized, out=quantized)
+    np.clip(quantized, -32768, 32767, out=quantized)
+    return quantized.astype(np.int16)
+
+
+def _fill_block(block, sinusoidal_data, noise_level, rng):
+    fill_noisy_rows = _noisy_rows_kernel()
+    if fill_noisy_rows is not None:
+        # The sinusoid is broadcast along the last axis, so fill a 2D view row by row
+        base = np.ascontiguousarray(np.broadcast_to(sinusoidal_data, block.shape[-1:]))
+        fill_noisy_rows(block.reshape(-1, block.shape[-1]), base, np.float32(noise_level))
+    else:
+        rng.standard_normal(size=block.shape, dtype=np.float32, out=block)
+        np.multiply(block, np.float32(noise_level), out=block)
+        np.add(block, sinusoidal_data, out=block)
+
+
+def generate_test_data(array_size, noise_level=5, amplitude=20, offset=20, quantize=None, backing=None):
     """Generate sinusoidal test data with noise.
 
+    The output is allocated once as float32 and filled in place, so no
+    full-size float64 temporaries are created. If numba is installed the
+    fill runs as a parallel JIT-compiled kernel.
+
     Args:
         array_size: Tuple specifying dimensions of output array
         noise_level: Standard deviation of Gaussian noise to add
         amplitude: Amplitude of sine wave
         offset: Vertical offset of sine wave
+        quantize: Optional (scale, offset) tuple. If given, the data is quantized to
+            int16 once here, so write benchmarks measure compressor throughput and
+            not the float to integer cast
+        backing: Optional path of a file to back the output with a numpy.memmap.
+            The data is then filled block by block and the OS manages the pages,
+            which keeps large arrays out of RAM. The caller removes the file.
 
     Returns:
         numpy.ndarray: Array containing sinusoidal data with noise
     """
-    x = np.linspace(0, 2 * np.pi * (array_size[1] / 100), array_size[1])
-    sinusoidal_data = amplitude * np.sin(x) + offset
-    noise = np.random.normal(0, noise_level, array_size)
-    return (sinusoidal_data + noise).astype(np.float32)
+    sinusoidal_data = _sinusoid_base(array_size[1], amplitude, offset)
+    rng = np.random.default_rng()
+
+    if backing is None:
+        out = np.empty(array_size, dtype=np.float32)
+        _fill_block(out, sinusoidal_data, noise_level, rng)
+    else:
+        out = np.memmap(backing, dtype=np.float32, mode="w+", shape=array_size)
+        # Fill in blocks along the first axis, so the working set stays small
+        block_rows = 256
+        for i in range(0, array_size[0], block_rows):
+            _fill_block(out[i : i + block_rows], sinusoidal_data, noise_level, rng)
+        out.flush()
+
+    if quantize is not None:
+        return quantize_int16(out, *quantize)
+    return out
@@ -1,68 +1,269 @@
+from __future__ import annotations
+
+import os
+import zlib
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import product
 from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-import h5py
-import netCDF4 as nc
 import numpy as np
-import omfiles as om
-import tensorstore as ts
-import xarray as xr
-import zarr
-from omfiles.types import BasicSelection
+
+# The format libraries are imported lazily by the readers that need them,
+# so benchmarking one format does not pay the import time of all others.
+if TYPE_CHECKING:
+    import h5py
+    import hidefix
+    import netCDF4 as nc
+    import omfiles as om
+    import tensorstore as ts
+    import zarr
+    from omfiles.types import BasicSelection
 
 
 class BaseReader(ABC):
+    # Readers sit on the hot path of the read benchmarks: slots avoid a per-instance
+    # __dict__ and make attribute lookups on the reader cheaper
+    __slots__ = ("filename",)
     filename: Path
+    # whether prefetch actually starts a read, the default one does nothing
+    supports_prefetch = False
 
     def __init__(self, filename: str):
         self.filename = Path(filename)
 
+    def read(self, index: BasicSelection, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Read the selection, optionally into a preallocated output buffer."""
+        data = self._read(index)
+        if out is None:
+            return data
+        np.copyto(out, data, casting="no")
+        return out
+
+    def prefetch(self, index: BasicSelection) -> None:
+        """Start reading the selection in the background, if the backend supports it.
+
+        A following read of the same selection then picks up the prefetched data.
+        """
+
     @abstractmethod
-    def read(self, index: BasicSelection) -> np.ndarray:
-        raise NotImplementedError("The read method must be implemented by subclasses")
+    def _read(self, index: BasicSelection) -> np.ndarray:
+        raise NotImplementedError("The _read method must be implemented by subclasses")
 
     @abstractmethod
     def close(self) -> None:
         raise NotImplementedError("The close method must be implemented by subclasses")
 
+    def __enter__(self) -> "BaseReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
 
 class HDF5Reader(BaseReader):
+    __slots__ = ("h5_reader",)
     h5_reader: h5py.Dataset
+    # minimum number of chunks that fit into the chunk cache
+    cached_chunks = 8
 
     def __init__(self, filename: str):
         super().__init__(filename)
-        file = h5py.File(self.filename, "r")
-        dataset = file["dataset"]
-        if not isinstance(dataset, h5py.Dataset):
-            raise TypeError("Expected a h5py Dataset")
-        self.h5_reader = dataset
-
-    def read(self, index: BasicSelection) -> np.ndarray:
+        import h5py
+
+        # Peek at the chunk shape to size the raw data chunk cache, then reopen with it.
+        # The cache holds at least a few chunks, so overlapping reads do not re-read
+        # and re-decompress the same chunks.
+        with h5py.File(self.filename, "r") as file:
+            dataset = file["dataset"]
+            if not isinstance(dataset, h5py.Dataset):
+                raise TypeError("Expected a h5py Dataset")
+            chunks = dataset.chunks or dataset.shape
+            chunk_bytes = int(np.prod(chunks)) * dataset.dtype.itemsize
+
+        file = h5py.File(
+            self.filename,
+            "r",
+            rdcc_nbytes=max(chunk_bytes * self.cached_chunks, 16 * 1024 * 1024),
+            rdcc_nslots=12421,  # prime, about 100 times the number of cached chunks
+            rdcc_w0=0.75,
+        )
+        self.h5_reader = file["dataset"]
+
+    def read(self, index: BasicSelection, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            return self._read(index)
+        self.h5_reader.read_direct(out, source_sel=index)
+        return out
+
+    def _read(self, index: BasicSelection) -> np.ndarray:
         return self.h5_reader[index]
 
     def close(self) -> None:
         self.h5_reader.file.close()
 
 
+def _expand_ellipsis(index: BasicSelection, ndim: int) -> tuple:
+    """Spell out the selection with one entry per dimension, replacing any Ellipsis by full slices."""
+    index = index if isinstance(index, tuple) else (index,)
+    for position, item in enumerate(index):
+        if item is Ellipsis:
+            index = index[:position] + (slice(None),) * (ndim - len(index) + 1) + index[position + 1 :]
+            break
+    return index + (slice(None),) * (ndim - len(index))
+
+
 class HDF5HidefixReader(BaseReader):
-    h5_reader: xr.Dataset
+    __slots__ = ("h5_dataset", "shape")
+    h5_dataset: hidefix.Dataset  # type: ignore
+    shape: Tuple[int, ...]
 
     def __init__(self, filename: str):
         super().__init__(filename)
-        self.h5_reader = xr.open_dataset(self.filename, engine="hidefix")
+        import hidefix
 
-    def read(self, index: BasicSelection) -> np.ndarray:
-        return self.h5_reader["dataset"][index].values
+        # Read through the hidefix index directly instead of the hidefix xarray backend,
+        # which adds DataArray indexing and lazy loading indirection on every read
+        self.h5_dataset = hidefix.Index(str(self.filename)).dataset("dataset")
+        self.shape = tuple(self.h5_dataset.shape())
+
+    def _read(self, index: BasicSelection) -> np.ndarray:
+        # hidefix neither supports Ellipsis nor keeps dimensions of size 1, so pass every
+        # dimension explicitly and restore the shape NumPy indexing would give
+        data = self.h5_dataset[_expand_ellipsis(index, len(self.shape))]
+        return data.reshape(np.broadcast_to(np.empty((), dtype=data.dtype), self.shape)[index].shape)
+
+    def close(self) -> None:
+        # the hidefix index has no close, it is released together with the reader
+        pass
+
+
+class HDF5ParallelReader(HDF5Reader):
+    """HDF5 reader that decodes the chunks of a selection on a thread pool.
+
+    The raw chunks are read with the direct chunk API and inflated and unshuffled
+    in Python, where zlib releases the GIL. Only deflate and shuffle filters are
+    supported, anything else falls back to the serial HDF5 pipeline.
+    """
+
+    __slots__ = ("_executor", "_filters")
+    _executor: ThreadPoolExecutor
+    _filters: Optional[List[int]]
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        import h5py
+
+        self._executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+        dataset = self.h5_reader
+        plist = dataset.id.get_create_plist()
+        filters = [plist.get_filter(i)[0] for i in range(plist.get_nfilters())]
+        supported = {h5py.h5z.FILTER_DEFLATE, h5py.h5z.FILTER_SHUFFLE}
+        self._filters = filters if dataset.chunks is not None and set(filters) <= supported else None
+
+    def read(self, index: BasicSelection, out: Optional[np.ndarray] = None) -> np.ndarray:
+        bounds = self._selection_bounds(index)
+        if self._filters is None or bounds is None:
+            return super().read(index, out)
+
+        starts, stops, squeeze = bounds
+        dataset = self.h5_reader
+        block = np.empty(tuple(stop - start for start, stop in zip(starts, stops)), dtype=dataset.dtype)
+        chunk_ranges = [
+            range(start // chunk * chunk, stop, chunk) for start, stop, chunk in zip(starts, stops, dataset.chunks)
+        ]
+        # consume the results, so errors of the workers are raised here
+        for _ in self._executor.map(lambda offset: self._copy_chunk(offset, starts, stops, block), product(*chunk_ranges)):
+            pass
+
+        data = block.reshape(tuple(n for n, drop in zip(block.shape, squeeze) if not drop))
+        if out is None:
+            return data
+        np.copyto(out, data, casting="no")
+        return out
+
+    def _selection_bounds(self, index: BasicSelection) -> Optional[Tuple[List[int], List[int], List[bool]]]:
+        """Return start, stop and whether to drop each dimension, or None for unsupported selections."""
+        starts: List[int] = []
+        stops: List[int] = []
+        squeeze: List[bool] = []
+        for item, size in zip(_expand_ellipsis(index, self.h5_reader.ndim), self.h5_reader.shape):
+            if isinstance(item, slice):
+                start, stop, step = item.indices(size)
+                if step != 1 or stop <= start:
+                    return None
+                starts.append(start)
+                stops.append(stop)
+                squeeze.append(False)
+            elif isinstance(item, (int, np.integer)):
+                position = int(item) + size if item < 0 else int(item)
+                starts.append(position)
+                stops.append(position + 1)
+                squeeze.append(True)
+            else:
+                return None
+        return starts, stops, squeeze
+
+    def _copy_chunk(self, offset: Tuple[int, ...], starts: List[int], stops: List[int], block: np.ndarray) -> None:
+        dataset = self.h5_reader
+        filter_mask, raw = dataset.id.read_direct_chunk(offset)
+        chunk = self._decode(raw, filter_mask).reshape(dataset.chunks)
+
+        # copy the part of the chunk that lies inside the selection
+        source, target = [], []
+        for chunk_start, chunk_length, start, stop in zip(offset, dataset.chunks, starts, stops):
+            low, high = max(start, chunk_start), min(stop, chunk_start + chunk_length)
+            source.append(slice(low - chunk_start, high - chunk_start))
+            target.append(slice(low - start, high - start))
+        block[tuple(target)] = chunk[tuple(source)]
+
+    def _decode(self, raw: bytes, filter_mask: int) -> np.ndarray:
+        import h5py
+
+        dtype = self.h5_reader.dtype
+        data = raw
+        # undo the filters in reverse pipeline order, skipping those the mask disabled for this chunk
+        for position, h5_filter in reversed(list(enumerate(self._filters or []))):
+            if filter_mask & (1 << position):
+                continue
+            if h5_filter == h5py.h5z.FILTER_DEFLATE:
+                data = zlib.decompress(data)
+            else:
+                shuffled = np.frombuffer(data, dtype=np.uint8)
+                data = shuffled.reshape(dtype.itemsize, -1).T.tobytes()
+        return np.frombuffer(data, dtype=dtype)
 
     def close(self) -> None:
-        self.h5_reader.close()
+        self._executor.shutdown()
+        super().close()
+
+
+@lru_cache(maxsize=None)
+def _configure_zarr_concurrency() -> None:
+    """Raise the async concurrency of zarr, once per process.
+
+    zarr reads the setting on every read, so it cannot be scoped to opening an
+    array. Reads spanning many chunks fetch and decode them concurrently, do not
+    leave that bounded by a conservative default. The setting is the same for all
+    zarr readers, so their results stay comparable.
+    """
+    import zarr
+
+    zarr.config.set({"async.concurrency": max(64, (os.cpu_count() or 1) * 2)})
 
 
 class ZarrReader(BaseReader):
+    __slots__ = ("zarr_reader",)
     zarr_reader: zarr.Array
 
     def __init__(self, filename: str):
         super().__init__(filename)
+        import zarr
+
+        _configure_zarr_concurrency()
+
         z = zarr.open(str(self.filename), mode="r")
         if not isinstance(z, zarr.Group):
             raise TypeError("Expected a zarr Group")
@@ -72,18 +273,48 @@ class ZarrReader(BaseReader):
 
         self.zarr_reader = array
 
-    def read(self, index: BasicSelection) -> np.ndarray:
-        return self.zarr_reader[index].__array__()
+    def _read(self, index: BasicSelection) -> np.ndarray:
+        # zarr already returns a NumPy array for the default buffer, asarray does not copy it
+        return np.asarray(self.zarr_reader[index])
 
     def close(self) -> None:
         self.zarr_reader.store.close()
 
 
+class ZarrsCodecsZarrReader(ZarrReader):
+    """Zarr reader that decodes chunks with the Rust zarrs codec pipeline."""
+
+    __slots__ = ()
+
+    def __init__(self, filename: str, direct_io: bool = False):
+        import zarr
+
+        # The codec pipeline is created when the array is opened, so the settings
+        # only need to be active for the open and do not leak into other readers
+        with zarr.config.set(
+            {
+                "codec_pipeline.path": "zarrs.ZarrsCodecPipeline",
+                # the benchmark files are trusted, skip the per-chunk checksum pass
+                "codec_pipeline.validate_checksums": False,
+                # decode up to one chunk per CPU at the same time
+                "codec_pipeline.chunk_concurrent_maximum": os.cpu_count() or 1,
+                # let the chunks bypass the page cache, meant for cold cache runs
+                "codec_pipeline.direct_io": direct_io,
+            }
+        ):
+            super().__init__(filename)
+
+
 class TensorStoreZarrReader(BaseReader):
+    __slots__ = ("ts_reader", "_pending")
     ts_reader: ts.TensorStore # type: ignore
+    _pending: Optional[Tuple[BasicSelection, ts.Future]] # type: ignore
+    supports_prefetch = True
 
     def __init__(self, filename: str):
         super().__init__(filename)
+        import tensorstore as ts
+
         # Open the Zarr file using TensorStore
         self.ts_reader = ts.open({ # type: ignore
             'driver': 'zarr',
@@ -94,42 +325,71 @@ class TensorStoreZarrReader(BaseReader):
             'path': 'arr_0',
             'open': True,
         }).result()
-
-    def read(self, index: BasicSelection) -> np.ndarray:
+        self._pending = None
+
+    def prefetch(self, index: BasicSelection) -> None:
+        # TensorStore reads are asynchronous, only submit the read here
+        self._pending = (index, self.ts_reader[index].read())
+
+    def _read(self, index: BasicSelection) -> np.ndarray:
+        if self._pending is not None:
+            pending_index, future = self._pending
+            self._pending = None
+            if pending_index == index:
+                return future.result()
         return self.ts_reader[index].read().result()
 
     def close(self) -> None:
-        pass
+        self._pending = None
 
 
 class NetCDFReader(BaseReader):
+    __slots__ = ("nc_reader", "nc_variable")
     nc_reader: nc.Dataset
+    nc_variable: nc.Variable
+    # minimum number of chunks that fit into the chunk cache
+    cached_chunks = 8
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, chunk_cache: bool = True):
         super().__init__(filename)
-        # disable netcdf caching: https://www.unidata.ucar.edu/software/netcdf/workshops/2012/nc4chunking/Cache.html
-        nc.set_chunk_cache(0, 0, 0)
+        import netCDF4 as nc
+
+        # netcdf chunk cache: https://www.unidata.ucar.edu/software/netcdf/workshops/2012/nc4chunking/Cache.html
+        if chunk_cache:
+            nc.set_chunk_cache(size=64 * 1024 * 1024, nelems=4133, preemption=0.75)
+        else:
+            nc.set_chunk_cache(0, 0, 0)
 
         self.nc_reader = nc.Dataset(self.filename, "r")
+        self.nc_variable = self.nc_reader.variables["dataset"]
+
+        chunking = self.nc_variable.chunking()
+        if chunk_cache and chunking != "contiguous":
+            # like for HDF5, hold at least a few chunks of this variable
+            chunk_bytes = int(np.prod(chunking)) * self.nc_variable.dtype.itemsize
+            self.nc_variable.set_var_chunk_cache(
+                size=max(chunk_bytes * self.cached_chunks, 16 * 1024 * 1024), nelems=1009, preemption=0.75
+            )
 
-    def read(self, index: BasicSelection) -> np.ndarray:
-        return self.nc_reader.variables["dataset"][index]
+    def _read(self, index: BasicSelection) -> np.ndarray:
+        return self.nc_variable[index]
 
     def close(self) -> None:
         self.nc_reader.close()
 
 
 class OMReader(BaseReader):
+    __slots__ = ("om_reader",)
     om_reader: om.OmFilePyReader
 
     def __init__(self, filename: str):
         super().__init__(filename)
+        import omfiles as om
+
         self.om_reader = om.OmFilePyReader(str(self.filename))
 
-    def read(self, index: BasicSelection) -> np.ndarray:
+    def _read(self, index: BasicSelection) -> np.ndarray:
         return self.om_reader[index]
 
     def close(self) -> None:
-        pass
-        # TODO: Implement close method
-        # self.om_reader.close()
+        self.om_reader.close()
@@ -1,16 +1,22 @@
+from __future__ import annotations
+
 import os
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from pathlib import Path
-from typing import Tuple
+from typing import TYPE_CHECKING, Iterator, Tuple, Union
+
+import numpy as np
 
-import h5py
-import netCDF4 as nc
-import omfiles as om
-import zarr
-from zarr.core.buffer import NDArrayLike
+# The format libraries are imported lazily by the writers that need them,
+# so benchmarking one format does not pay the import time of all others.
+if TYPE_CHECKING:
+    from zarr.core.buffer import NDArrayLike
 
 
 class BaseWriter(ABC):
+    __slots__ = ("filename",)
+
     def __init__(self, filename: str):
         self.filename = Path(filename)
 
@@ -24,13 +30,7 @@ class BaseWriter(ABC):
 
         # For directories (like Zarr stores), calculate total size recursively
         if path.is_dir():
-            total_size = 0
-            for dirpath, _, filenames in os.walk(path):
-                for f in filenames:
-                    fp = Path(dirpath) / f
-                    if fp.is_file():
-                        total_size += fp.stat().st_size
-            return total_size
+            return _directory_size(path)
         # For regular files
         elif path.is_file():
             return path.stat().st_size
@@ -38,38 +38,117 @@ class BaseWriter(ABC):
             return 0
 
 
+def _directory_size(path: Union[str, os.PathLike]) -> int:
+    """Sum the sizes of all files below path, with one stat per entry and no Path objects."""
+    total_size = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                total_size += _directory_size(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                total_size += entry.stat(follow_symlinks=False).st_size
+    return total_size
+
+
+def _chunk_aligned_slabs(length: int, chunk_length: int) -> Iterator[slice]:
+    """Split the first axis into slabs of whole chunks, so data can be written piece by piece."""
+    for start in range(0, length, chunk_length):
+        yield slice(start, min(start + chunk_length, length))
+
+
 class HDF5Writer(BaseWriter):
+    __slots__ = ()
+
     def write(self, data: NDArrayLike, chunk_size: Tuple[int, ...]) -> None:
+        import h5py
+
         with h5py.File(self.filename, "w") as f:
-            f.create_dataset("dataset", data=data, chunks=chunk_size)
+            # deflate with byte shuffling, the same compression as the netCDF writer
+            dataset = f.create_dataset(
+                "dataset",
+                shape=data.shape,
+                dtype=data.dtype,
+                chunks=chunk_size,
+                compression="gzip",
+                compression_opts=4,
+                shuffle=True,
+            )
+            for slab in _chunk_aligned_slabs(data.shape[0], chunk_size[0]):
+                dataset[slab] = data[slab]
 
 
 class ZarrWriter(BaseWriter):
-    def write(self, data: NDArrayLike, chunk_size: Tuple[int, ...]) -> None:
+    __slots__ = ("compressors",)
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
         import numcodecs
-        compressors = numcodecs.Blosc(cname='zstd', clevel=3, shuffle=numcodecs.Blosc.BITSHUFFLE)
-        # zarr.create_array(str(self.filename), name="arr_0", data=data, chunks=chunk_size, compressors=compressors, zarr_format=2, overwrite=True)
-        root = zarr.open(str(self.filename), mode="w", zarr_format=2)
-        # Ensure root is a Group and not an Array (for type checker)
-        if not isinstance(root, zarr.Group):
-            raise TypeError("Expected root to be a zarr.hierarchy.Group")
-        arr_0 = root.create_array("arr_0", shape=data.shape, chunks=chunk_size, dtype="f4", compressor=compressors)
-        arr_0[:] = data
+        # Build the codec once instead of on every write iteration
+        self.compressors = numcodecs.Blosc(cname='zstd', clevel=3, shuffle=numcodecs.Blosc.BITSHUFFLE)
+
+    def write(self, data: NDArrayLike, chunk_size: Tuple[int, ...]) -> None:
+        import zarr
+
+        # Create the array and its parent group in a single pass over the store
+        arr_0 = zarr.create_array(
+            str(self.filename),
+            name="arr_0",
+            shape=data.shape,
+            chunks=tuple(chunk_size),
+            dtype=data.dtype,
+            compressors=self.compressors,
+            zarr_format=2,
+            overwrite=True,
+        )
+        for slab in _chunk_aligned_slabs(data.shape[0], chunk_size[0]):
+            arr_0[slab] = data[slab]
+
+
+@lru_cache(maxsize=16)
+def _dimension_names(ndim: int) -> Tuple[str, ...]:
+    return tuple(f"dim{i}" for i in range(ndim))
 
 
 class NetCDFWriter(BaseWriter):
+    __slots__ = ("diskless",)
+
+    def __init__(self, filename: str, diskless: bool = False):
+        super().__init__(filename)
+        # With diskless=True the dataset is built in memory and only persisted on close,
+        # which separates the netCDF compute overhead from the chunk write cost
+        self.diskless = diskless
+
     def write(self, data: NDArrayLike, chunk_size: Tuple[int, ...]) -> None:
-        with nc.Dataset(self.filename, "w", format="NETCDF4") as ds:
-            dimension_names = tuple(f"dim{i}" for i in range(data.ndim))
+        import netCDF4 as nc
+
+        with nc.Dataset(self.filename, "w", format="NETCDF4", diskless=self.diskless, persist=True) as ds:
+            dimension_names = _dimension_names(data.ndim)
             for dim, size in zip(dimension_names, data.shape):
                 ds.createDimension(dim, size)
 
-            var = ds.createVariable("dataset", data.dtype, dimension_names, chunksizes=chunk_size)
-            var[:] = data
+            var = ds.createVariable(
+                "dataset", data.dtype, dimension_names, chunksizes=chunk_size, compression="zlib", complevel=4, shuffle=True
+            )
+            for slab in _chunk_aligned_slabs(data.shape[0], chunk_size[0]):
+                var[slab] = data[slab]
 
 
 class OMWriter(BaseWriter):
+    __slots__ = ("buffer_capacity",)
+
+    def __init__(self, filename: str, buffer_capacity: int = 1024 * 1024):
+        super().__init__(filename)
+        # Batch many small compressed chunks into few large writes
+        self.buffer_capacity = buffer_capacity
+
     def write(self, data: NDArrayLike, chunk_size: Tuple[int, ...]) -> None:
-        writer = om.OmFilePyWriter(str(self.filename))
-        variable = writer.write_array(data.__array__(), chunk_size, 100, 0)
+        import omfiles as om
+
+        # asarray does not copy data that already is a NumPy array
+        data = np.asarray(data)
+        # The uncompressed size is an upper bound for the file, reserve it up front
+        writer = om.OmFilePyWriter(
+            str(self.filename), buffer_capacity=self.buffer_capacity, preallocate=data.nbytes
+        )
+        variable = writer.write_array(data, chunk_size, 100, 0)
         writer.close(variable)
@@ -1,6 +1,9 @@
-from typing import Tuple
+from __future__ import annotations
 
-from zarr.core.buffer import NDArrayLike
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from zarr.core.buffer import NDArrayLike
 
 
 def print_data_info(data: NDArrayLike, chunk_size: Tuple[int, ...]) -> None:
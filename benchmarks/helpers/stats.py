@@ -1,24 +1,35 @@
 import gc
-import statistics
+import os
 import time
 import tracemalloc
 from dataclasses import dataclass
 from functools import wraps
-from typing import Any, Callable, Dict, List, NamedTuple, TypeVar
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, TypeVar, Union
+
+import numpy as np
+import psutil  # type: ignore
 
 T = TypeVar("T")
 
+CACHE_MODES = ("warm", "cold", "mixed")
+
 
 @dataclass
 class BenchmarkStats:
-    mean: float
-    std: float
+    median: float
+    mad: float
     min: float
     max: float
-    cpu_mean: float
-    cpu_std: float
+    cpu_median: float
+    cpu_mad: float
     memory_usage: float
     file_size: float = 0
+    rss_delta: float = 0
+    inner_loops: int = 1
+    p95: float = 0
+    p99: float = 0
+    stalls: int = 0
 
 
 class MeasurementResult(NamedTuple):
@@ -26,58 +37,224 @@ class MeasurementResult(NamedTuple):
     elapsed: float
     cpu_elapsed: float
     memory_delta: float
+    rss_delta: float
+
+
+def measure_execution(
+    func: Optional[Callable[..., T]] = None, *, trace_memory: bool = False
+) -> Any:
+    """Measure time, CPU time and RSS delta of a single call of func.
+
+    Can be used as `@measure_execution` or `@measure_execution(trace_memory=True)`.
+    Tracing Python heap allocations with tracemalloc is expensive, so it is opt-in
+    and done in a separate call that is not timed.
+    """
+
+    def decorator(func: Callable[..., T]) -> Callable[..., MeasurementResult]:
+        process = psutil.Process()
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> MeasurementResult:
+            # measure time with monotonic clocks, so wall-clock jumps (NTP, DST)
+            # cannot corrupt the measurement, and without GC pauses in between.
+            # The RSS delta covers Python as well as native (Rust/C) allocations
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                rss_before = process.memory_info().rss
+                start_ns = time.perf_counter_ns()
+                cpu_start_ns = time.process_time_ns()
+                result = func(*args, **kwargs)
+                elapsed_time = (time.perf_counter_ns() - start_ns) / 1e9
+                cpu_elapsed_time = (time.process_time_ns() - cpu_start_ns) / 1e9
+                rss_delta = process.memory_info().rss - rss_before
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+
+            memory_delta = 0
+            if trace_memory:
+                # peak of Python heap allocations during a second, untimed call
+                del result
+                tracemalloc.start()
+                try:
+                    traced_before = tracemalloc.get_traced_memory()[0]
+                    result = func(*args, **kwargs)
+                    memory_delta = tracemalloc.get_traced_memory()[1] - traced_before
+                finally:
+                    tracemalloc.stop()
+
+            # fmt: off
+            return MeasurementResult(
+                result=result,
+                elapsed=elapsed_time,
+                cpu_elapsed=cpu_elapsed_time,
+                memory_delta=memory_delta,
+                rss_delta=rss_delta
+            )
+
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+def drop_page_cache(path: Union[str, Path]) -> None:
+    """Evict the files under path from the OS page cache, so the next read is cold.
+
+    Dropping all caches needs root, otherwise fall back to posix_fadvise on each file.
+    """
+    os.sync()
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3")
+        return
+    except OSError:
+        pass
+
+    if not hasattr(os, "posix_fadvise"):
+        return
+    path = Path(path)
+    files = [p for p in path.rglob("*") if p.is_file()] if path.is_dir() else [path]
+    for file in files:
+        fd = os.open(file, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
 
+def _median_absolute_deviation(values: np.ndarray, median: float) -> float:
+    return float(np.median(np.abs(values - median)))
 
-def measure_execution(func: Callable[..., T]) -> Callable[..., MeasurementResult]:
-    @wraps(func)
-    def wrapper(*args: Any, **kwargs: Any) -> MeasurementResult:
-        # measure time
-        start_time = time.time()
-        cpu_start_time = time.process_time()
-        result = func(*args, **kwargs)
-        elapsed_time = time.time() - start_time
-        cpu_elapsed_time = time.process_time() - cpu_start_time
 
-        # measure memory
-        del result
+def _warm_up(
+    func: Callable[..., MeasurementResult], warmup: int, cache_mode: str, cache_path: Optional[Union[str, Path]]
+) -> None:
+    """Run and discard the warmup calls, then bring the page cache into the state of cache_mode."""
+    for _ in range(warmup):
+        func()
+    # the warmup filled the page cache, a mixed run has to start from a cold one
+    if cache_mode == "mixed" and cache_path is not None:
+        drop_page_cache(cache_path)
+
+
+def _calibrate_inner_loops(func: Callable[..., MeasurementResult], min_sample_time: float, max_inner_loops: int) -> int:
+    """Double the number of inner loops until one sample takes at least min_sample_time."""
+    inner_loops = 1
+    while inner_loops < max_inner_loops:
+        elapsed = sum(func().elapsed for _ in range(inner_loops))
+        if elapsed >= min_sample_time:
+            break
+        inner_loops = min(inner_loops * 2, max_inner_loops)
+    return inner_loops
+
+
+def run_multiple_benchmarks(
+    func: Callable[..., MeasurementResult],
+    iterations: int = 20,
+    warmup: int = 1,
+    cache_mode: str = "warm",
+    cache_path: Optional[Union[str, Path]] = None,
+    min_sample_time: float = 0.1,
+    max_inner_loops: int = 10_000,
+    cpu_pin: Optional[int] = None,
+    stall_threshold: float = 15.0,
+    before_call: Optional[Callable[[], None]] = None,
+) -> BenchmarkStats:
+    """Run func repeatedly and aggregate the measurements, similar to pyperf.
+
+    The first `warmup` runs are discarded in every cache mode, so one-off
+    initialization costs do not distort the statistics. Each of the `iterations`
+    samples then runs func in an inner loop that is calibrated to take at least
+    `min_sample_time` seconds, and the time per call is aggregated into median
+    and median absolute deviation, which are robust against OS jitter.
+
+    `cache_mode` controls the page cache state of the files read by func:
+    "warm" reads all samples from the page cache filled by the warmup,
+    "cold" drops the page cache of `cache_path` before every call, and
+    "mixed" drops it once after the warmup, so the first sample reads cold and
+    the following ones warm. Only "warm" uses an inner loop.
+    If `cpu_pin` is given, the process is pinned to that CPU while measuring.
+    `before_call` runs before every call of func, after the page cache is dropped,
+    and is not timed.
+
+    I/O timings are skewed, so besides the median the 95th and 99th percentiles
+    and the number of calls slower than `stall_threshold` seconds are reported.
+    """
+    if cache_mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode: {cache_mode}")
+    if cache_mode in ("cold", "mixed") and cache_path is None:
+        raise ValueError(f"A cache_path is required to benchmark with a {cache_mode} cache")
+
+    # one preallocated row per sample: time, cpu time, traced memory, rss delta
+    samples = np.empty((iterations, 4), dtype=np.float64)
+
+    previous_affinity = None
+    if cpu_pin is not None and hasattr(os, "sched_setaffinity"):
+        previous_affinity = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, {cpu_pin})
+
+    def call() -> MeasurementResult:
+        if before_call is not None:
+            before_call()
+        return func()
+
+    try:
+        # Every mode runs the warmup, so no sample pays for first-call costs like
+        # imports, reader setup or the lazy initialization of codecs
+        _warm_up(call, warmup, cache_mode, cache_path)
+
+        if cache_mode == "warm":
+            # a sample has to span many ticks of the clock for its timing to be meaningful
+            clock_resolution = time.get_clock_info("perf_counter").resolution
+            inner_loops = _calibrate_inner_loops(call, max(min_sample_time, 1000 * clock_resolution), max_inner_loops)
+        else:
+            inner_loops = 1
+
+        # measure_execution keeps the GC off during each call. Collect the garbage of
+        # the warmup and calibration now, so no full collection runs between samples
+        # and evicts the CPU caches right before a timed call.
         gc.collect()
-        tracemalloc.start()
-        start_snapshot = tracemalloc.take_snapshot()
-        result = func(*args, **kwargs)
-        end_snapshot = tracemalloc.take_snapshot()
-        tracemalloc.stop()
-        memory_delta = sum(stat.size_diff for stat in end_snapshot.compare_to(start_snapshot, "lineno"))
-
-        # fmt: off
-        return MeasurementResult(
-            result=result,
-            elapsed=elapsed_time,
-            cpu_elapsed=cpu_elapsed_time,
-            memory_delta=memory_delta
-        )
-
-    return wrapper
-
-
-def run_multiple_benchmarks(func: Callable[..., MeasurementResult], iterations: int = 5) -> BenchmarkStats:
-    times: List[float] = []
-    cpu_times: List[float] = []
-    memory_usages: List[float] = []
-
-    for _ in range(iterations):
-        result = func()
-        times.append(result.elapsed)
-        cpu_times.append(result.cpu_elapsed)
-        memory_usages.append(result.memory_delta)
 
+        # checked per call, an average over the inner loop would dilute a single stall
+        stalls = 0
+        for i in range(iterations):
+            elapsed = cpu_elapsed = memory_delta = rss_delta = 0.0
+            for _ in range(inner_loops):
+                if cache_mode == "cold" and cache_path is not None:
+                    drop_page_cache(cache_path)
+                result = call()
+                stalls += result.elapsed > stall_threshold
+                elapsed += result.elapsed
+                cpu_elapsed += result.cpu_elapsed
+                memory_delta += result.memory_delta
+                rss_delta += result.rss_delta
+            samples[i] = (elapsed, cpu_elapsed, memory_delta, rss_delta)
+    finally:
+        if previous_affinity is not None:
+            os.sched_setaffinity(0, previous_affinity)
+
+    samples /= inner_loops
+    times = samples[:, 0]
+    cpu_times = samples[:, 1]
+    median, p95, p99 = (float(q) for q in np.quantile(times, [0.5, 0.95, 0.99]))
+    cpu_median = float(np.median(cpu_times))
+    memory_usage, rss_delta = samples[:, 2:].mean(axis=0)
     return BenchmarkStats(
-        mean=statistics.mean(times),
-        std=statistics.stdev(times) if len(times) > 1 else 0,
-        min=min(times),
-        max=max(times),
-        cpu_mean=statistics.mean(cpu_times),
-        cpu_std=statistics.stdev(cpu_times) if len(cpu_times) > 1 else 0,
-        memory_usage=statistics.mean(memory_usages),
+        median=median,
+        mad=_median_absolute_deviation(times, median),
+        min=float(times.min()),
+        max=float(times.max()),
+        cpu_median=cpu_median,
+        cpu_mad=_median_absolute_deviation(cpu_times, cpu_median),
+        memory_usage=float(memory_usage),
+        rss_delta=float(rss_delta),
+        inner_loops=inner_loops,
+        p95=p95,
+        p99=p99,
+        stalls=stalls,
     )
 
 
@@ -95,6 +272,12 @@ def print_read_benchmark_results(results: Dict[str, BenchmarkStats]) -> None:
 
 
 def _print_benchmark_stats(stats: BenchmarkStats) -> None:
-    print(f"  Time: {stats.mean:.6f}s ± {stats.std:.6f}s (min: {stats.min:.6f}s, max: {stats.max:.6f}s)")
-    print(f"  CPU Time: {stats.cpu_mean:.6f}s ± {stats.cpu_std:.6f}s")
-    print(f"  Memory Delta: {stats.memory_usage:.2f} B")
+    print(
+        f"  Time: {stats.median:.6f}s ± {stats.mad:.6f}s (median ± MAD, min: {stats.min:.6f}s, max: {stats.max:.6f}s,"
+        f" {stats.inner_loops} loops per sample)"
+    )
+    print(f"  Tail: p95 {stats.p95:.6f}s, p99 {stats.p99:.6f}s, {stats.stalls} stalls")
+    print(f"  CPU Time: {stats.cpu_median:.6f}s ± {stats.cpu_mad:.6f}s")
+    print(f"  RSS Delta: {stats.rss_delta:.2f} B")
+    if stats.memory_usage:
+        print(f"  Traced Memory Peak: {stats.memory_usage:.2f} B")
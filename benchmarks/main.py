@@ -1,16 +1,29 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
 from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Dict, Tuple
 
+import numpy as np
 from helpers.args import parse_args
 from helpers.formats import FormatFactory
-from helpers.generate_data import generate_test_data
+from helpers.generate_data import generate_test_data, quantize_int16
 from helpers.prints import print_data_info
 from helpers.stats import (
+    BenchmarkStats,
     measure_execution,
     print_read_benchmark_results,
     print_write_benchmark_results,
     run_multiple_benchmarks,
 )
-from zarr.core.buffer import NDArrayLike
+
+if TYPE_CHECKING:
+    from zarr.core.buffer import NDArrayLike
 
 # Define separate dictionaries for read and write formats and filenames
 write_formats_and_filenames = {
@@ -20,53 +33,167 @@ write_formats_and_filenames = {
     "om": "benchmark_files/data.om",
 }
 
+# Backing file of the generated test data when running with --memmap
+test_data_backing_file = "benchmark_files/data.raw"
+
 read_formats_and_filenames = {
     "h5": "benchmark_files/data.h5",
     "h5hidefix": "benchmark_files/data.h5",
+    "h5parallel": "benchmark_files/data.h5",
     "zarr": "benchmark_files/data.zarr",
     "zarrTensorStore": "benchmark_files/data.zarr",
+    "zarrZarrs": "benchmark_files/data.zarr",
     "nc": "benchmark_files/data.nc",
     "om": "benchmark_files/data.om",
 }
 
 
-def bm_write_all_formats(args: Namespace, data: NDArrayLike):
-    write_results = {}
-    for format_name, file in write_formats_and_filenames.items():
-        writer = FormatFactory.create_writer(format_name, file)
+def bm_write_format(args: Namespace, format_name: str, file: str, data: NDArrayLike) -> BenchmarkStats:
+    writer = FormatFactory.create_writer(format_name, file)
+
+    @measure_execution(trace_memory=args.trace_memory)
+    def write():
+        writer.write(data, args.chunk_size)
+
+    write_stats = run_multiple_benchmarks(write, args.iterations, warmup=args.warmup, cpu_pin=args.cpu_pin)
+    write_stats.file_size = writer.get_file_size()
+    return write_stats
 
-        @measure_execution
-        def write():
-            writer.write(data, args.chunk_size)
 
+def _bm_write_format_shared(
+    args: Namespace, format_name: str, file: str, shm_name: str, shape: Tuple[int, ...], dtype: np.dtype
+) -> BenchmarkStats:
+    # Runs in a worker process: view the test data in shared memory instead of unpickling a copy
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
         try:
-            write_stats = run_multiple_benchmarks(write, args.iterations)
-            write_stats.file_size = writer.get_file_size()
-            write_results[format_name] = write_stats
-        except Exception as e:
-            print(f"Error with {format_name}: {e}")
+            return bm_write_format(args, format_name, file, data)
+        finally:
+            # the buffer must not be exported anymore when the shared memory is closed
+            del data
+    finally:
+        shm.close()
+
+
+def _run_isolated(fn, *fn_args):
+    """Run fn in a fresh interpreter, so it does not see the libraries and heap of other formats."""
+    # spawn instead of fork, so the worker does not inherit thread pools or library state
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as executor:
+        return executor.submit(fn, *fn_args).result()
+
+
+def bm_write_all_formats(args: Namespace, data: NDArrayLike, label: str = ""):
+    write_results = {}
+    if args.parallel or args.isolate:
+        data = np.asarray(data)
+        shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        try:
+            shared_data = np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)
+            shared_data[...] = data
+            del shared_data
+            if args.parallel:
+                # Each format writes its own file, so they can run side by side. Separate processes
+                # avoid the GIL and process-global state of the C libraries, but the formats still
+                # compete for CPU and disk: use this for quick CI runs, not for isolated timings.
+                mp_context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=len(write_formats_and_filenames), mp_context=mp_context) as executor:
+                    futures = {
+                        format_name: executor.submit(
+                            _bm_write_format_shared, args, format_name, file, shm.name, data.shape, data.dtype
+                        )
+                        for format_name, file in write_formats_and_filenames.items()
+                    }
+                    for format_name, future in futures.items():
+                        try:
+                            write_results[format_name + label] = future.result()
+                        except Exception as e:
+                            print(f"Error with {format_name}: {e}")
+            else:
+                for format_name, file in write_formats_and_filenames.items():
+                    try:
+                        write_results[format_name + label] = _run_isolated(
+                            _bm_write_format_shared, args, format_name, file, shm.name, data.shape, data.dtype
+                        )
+                    except Exception as e:
+                        print(f"Error with {format_name}: {e}")
+        finally:
+            shm.close()
+            shm.unlink()
+    else:
+        for format_name, file in write_formats_and_filenames.items():
+            try:
+                write_results[format_name + label] = bm_write_format(args, format_name, file, data)
+            except Exception as e:
+                print(f"Error with {format_name}: {e}")
 
     print_write_benchmark_results(write_results)
 
 
-def bm_read_all_formats(args: Namespace):
+def bm_read_format(args: Namespace, format_name: str, file: str) -> Dict[str, BenchmarkStats]:
     read_results = {}
-    for format_name, file in read_formats_and_filenames.items():
-        reader = FormatFactory.create_reader(format_name, file)
+    for cache_mode in args.cache_mode:
+        reader_options = _reader_options(args, format_name, cache_mode)
+        # The file is opened once per cache mode and the handle is reused by all timed reads
+        with FormatFactory.create_reader(format_name, file, **reader_options) as reader:
+            # Dry run to allocate the output buffer once, all timed reads reuse it
+            out = np.array(reader.read(args.read_index))
+
+            @measure_execution(trace_memory=args.trace_memory)
+            def read():
+                return reader.read(args.read_index, out=out)
+
+            benchmark_prefetch = [False]
+            # A cold read could be served by a prefetch that is still in flight, so
+            # only prefetch with a warm cache
+            if args.prefetch and cache_mode == "warm" and reader.supports_prefetch:
+                benchmark_prefetch.append(True)
+            for prefetch in benchmark_prefetch:
+                read_stats = run_multiple_benchmarks(
+                    read,
+                    args.iterations,
+                    warmup=args.warmup,
+                    cache_mode=cache_mode,
+                    cache_path=file,
+                    cpu_pin=args.cpu_pin,
+                    # submit the read untimed right before the timed one picks it up
+                    before_call=partial(reader.prefetch, args.read_index) if prefetch else None,
+                )
+                read_results[_result_name(format_name, cache_mode, reader_options, prefetch)] = read_stats
+    return read_results
+
+
+def _result_name(format_name: str, cache_mode: str, reader_options: Dict[str, bool], prefetch: bool) -> str:
+    conditions = [] if cache_mode == "warm" else [f"{cache_mode} cache"]
+    if reader_options.get("direct_io"):
+        conditions.append("direct I/O")
+    if prefetch:
+        conditions.append("prefetch")
+    return f"{format_name} ({', '.join(conditions)})" if conditions else format_name
+
+
+def _reader_options(args: Namespace, format_name: str, cache_mode: str) -> Dict[str, bool]:
+    # Only the netCDF reader makes its chunk cache configurable
+    if format_name == "nc" and args.no_chunk_cache:
+        return {"chunk_cache": False}
+    # Direct I/O bypasses the page cache, only use it where every reader misses it
+    # anyway, so warm results still compare like with like
+    if format_name == "zarrZarrs" and cache_mode == "cold" and sys.platform == "linux":
+        return {"direct_io": True}
+    return {}
 
-        @measure_execution
-        def read():
-            return reader.read(args.read_index)
 
+def bm_read_all_formats(args: Namespace):
+    read_results = {}
+    for format_name, file in read_formats_and_filenames.items():
         try:
-            # sample_data = reader.read(args.read_index)  # Get sample data for verification
-            read_stats = run_multiple_benchmarks(read, args.iterations)
-            read_results[format_name] = read_stats
-
+            if args.isolate:
+                read_results.update(_run_isolated(bm_read_format, args, format_name, file))
+            else:
+                read_results.update(bm_read_format(args, format_name, file))
         except Exception as e:
             print(f"Error with {format_name}: {e}")
-        finally:
-            reader.close()
 
     print_read_benchmark_results(read_results)
 
@@ -75,11 +202,26 @@ def main():
     # Defines chunk and array sizes
     args = parse_args()
 
-    data = generate_test_data(args.array_size, noise_level=5, amplitude=20, offset=20)
-    print_data_info(data, args.chunk_size)
-    bm_write_all_formats(args, data)
-
-    bm_read_all_formats(args)
+    backing = None
+    if args.memmap:
+        backing = test_data_backing_file
+        os.makedirs(os.path.dirname(backing), exist_ok=True)
+
+    try:
+        data = generate_test_data(args.array_size, noise_level=5, amplitude=20, offset=20, backing=backing)
+        print_data_info(data, args.chunk_size)
+        bm_write_all_formats(args, data)
+
+        bm_read_all_formats(args)
+
+        if args.int16:
+            # Quantize once up front with the same precision as the om scale factor of 100,
+            # so the timed writes measure compressor throughput and not the cast
+            int16_data = quantize_int16(data, scale=0.01, offset=0.0)
+            bm_write_all_formats(args, int16_data, label=" (int16)")
+    finally:
+        if backing is not None and os.path.exists(backing):
+            os.unlink(backing)
 
 
 if __name__ == "__main__":
@@ -16,14 +16,21 @@ class OmVariable:
 class OmFilePyWriter:
     """A Python wrapper for the Rust OmFileWriter implementation."""
 
-    def __init__(self, file_path: str) -> None:
+    def __init__(self, file_path: str, buffer_capacity: int = 8192, preallocate: Optional[int] = None) -> None:
         """
         Initialize an OmFilePyWriter.
 
         Args:
             file_path: Path where the .om file will be created
+            buffer_capacity: Size in bytes of the write buffer (default: 8192).
+                Compressed chunks are collected in this buffer and written to
+                the file in batches, so a larger value means fewer write calls.
+            preallocate: Optional number of bytes to reserve on disk up front,
+                e.g. the uncompressed size of the data. Only a hint, the file
+                size is not changed by it.
 
         Raises:
+            ValueError: If buffer_capacity is not positive
             OSError: If the file cannot be created
         """
         ...
@@ -234,6 +241,7 @@ class OmFilePyReader:
         Close the reader and release resources.
 
         This method releases all resources associated with the reader.
+        Reads that are running in other threads are finished first.
         After closing, any operation on the reader will raise a ValueError.
 
         It is safe to call this method multiple times.
@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+import itertools
+import os
+from collections import defaultdict
+from functools import lru_cache
+from typing import Optional
+
 import numpy as np
 from xarray.backends.common import BackendArray, BackendEntrypoint, WritableCFDataStore, _normalize_path
 from xarray.backends.store import StoreBackendEntrypoint
@@ -12,10 +18,22 @@ from .omfiles import OmFilePyReader, OmVariable
 
 # need some special secret attributes to tell us the dimensions
 DIMENSION_KEY = "_ARRAY_DIMENSIONS"
+OM_SUFFIX = ".om"
+# Runs of an integer array indexer that are at most this many elements apart are read
+# together, so nearby indices do not decode the same chunk in separate reads
+MAX_RUN_GAP = 128
 
 class OmXarrayEntrypoint(BackendEntrypoint):
     def guess_can_open(self, filename_or_obj):
-        return isinstance(filename_or_obj, str) and filename_or_obj.endswith(".om")
+        # xarray asks every backend on each open_dataset, answer plain paths directly
+        if type(filename_or_obj) is str:
+            return filename_or_obj.endswith(OM_SUFFIX)
+        try:
+            path = os.fspath(filename_or_obj)
+        except TypeError:
+            # file objects and the like, their content is not guessed
+            return False
+        return isinstance(path, str) and path.endswith(OM_SUFFIX)
 
     def open_dataset(
         self,
@@ -24,14 +42,24 @@ class OmXarrayEntrypoint(BackendEntrypoint):
         drop_variables=None,
     ) -> Dataset:
         filename_or_obj = _normalize_path(filename_or_obj)
-        with OmFilePyReader(filename_or_obj) as root_variable:
-            store = OmDataStore(root_variable)
+        # The reader has to stay open for the lazily loaded variables of the dataset:
+        # the store entrypoint registers store.close to run when the dataset is closed
+        root_variable = OmFilePyReader(filename_or_obj)
+        try:
+            store = OmDataStore(root_variable, drop_variables=drop_variables)
+        except BaseException:
+            root_variable.close()
+            raise
+        try:
             store_entrypoint = StoreBackendEntrypoint()
             return store_entrypoint.open_dataset(
                 store,
                 drop_variables=drop_variables,
             )
-        raise ValueError("Failed to open dataset")
+        except BaseException:
+            # the store has opened child readers by now, close them with the root
+            store.close()
+            raise
 
     description = "Use .om files in Xarray"
 
@@ -41,10 +69,33 @@ class OmXarrayEntrypoint(BackendEntrypoint):
 class OmDataStore(WritableCFDataStore):
     root_variable: OmFilePyReader
     variables_store: dict[str, OmVariable]
-
-    def __init__(self, root_variable: OmFilePyReader):
+    _children_by_parent: dict[str, dict[str, OmVariable]]
+    _known_dimensions: Optional[set[str]]
+    _reader_cache: dict[str, OmFilePyReader]
+    _attrs_cache: dict[str, dict]
+    _dimension_names: dict[str, Optional[tuple[str, ...]]]
+    _drop_variables: frozenset[str]
+
+    def __init__(self, root_variable: OmFilePyReader, drop_variables=None):
         self.root_variable = root_variable
+        # xarray builds every variable returned by get_variables before it drops any,
+        # so skip the dropped ones here and do not read their metadata at all
+        if isinstance(drop_variables, str):
+            drop_variables = [drop_variables]
+        self._drop_variables = frozenset(drop_variables or ())
         self.variables_store = self.root_variable.get_flat_variable_metadata()
+        # Index the flat variable paths by their parent path once, so looking up
+        # the children of a variable does not scan all variables of the file
+        self._children_by_parent = defaultdict(dict)
+        for key, variable in self.variables_store.items():
+            parent, _, name = key.rpartition("/")
+            # a root variable without a name is not its own child
+            if name:
+                self._children_by_parent[parent][name] = variable
+        self._known_dimensions = None
+        self._reader_cache = {}
+        self._attrs_cache = {}
+        self._dimension_names = {}
 
     def get_variables(self):
         return FrozenDict(self._get_datasets_for_variable(self.root_variable))
@@ -53,49 +104,80 @@ class OmDataStore(WritableCFDataStore):
         # Global attributes are attributes directly under the root variable.
         return FrozenDict(self._get_attributes_for_variable(self.root_variable, self.root_variable.name))
 
+    def _reader_for(self, variable: OmVariable) -> OmFilePyReader:
+        """Get the reader of a variable, opening it only once per store."""
+        reader = self._reader_cache.get(variable.name)
+        if reader is None:
+            reader = self.root_variable.init_from_variable(variable)
+            self._reader_cache[variable.name] = reader
+        return reader
+
     def _get_attributes_for_variable(self, reader: OmFilePyReader, path: str):
-        attrs = {}
-        direct_children = self._find_direct_children_in_store(path)
-        for k, variable in direct_children.items():
-            child_reader = reader.init_from_variable(variable)
-            if child_reader.is_scalar:
-                attrs[k] = child_reader.get_scalar()
-        return attrs
+        """Get the scalar children of the variable at path, computed once per path."""
+        attrs = self._attrs_cache.get(path)
+        if attrs is None:
+            attrs = {}
+            direct_children = self._find_direct_children_in_store(path)
+            for k, variable in direct_children.items():
+                child_reader = self._reader_for(variable)
+                if child_reader.is_scalar:
+                    attrs[k] = child_reader.get_scalar()
+            self._attrs_cache[path] = attrs
+        # callers filter the attributes, hand out a copy of the cached ones
+        return dict(attrs)
 
     def _find_direct_children_in_store(self, path: str):
-        prefix = "" if path == "" or path is None else path + "/"
-
-        return {
-            key[len(prefix):]: variable
-            for key, variable in self.variables_store.items()
-            if key.startswith(prefix) and key != path and "/" not in key[len(prefix):]
-        }
+        return self._children_by_parent.get(path or "", {})
 
     def _is_group(self, variable):
-        return self.root_variable.init_from_variable(variable).is_group
+        return self._reader_for(variable).is_group
+
+    def _get_dimension_names(self, path: str) -> Optional[tuple[str, ...]]:
+        """Get the names of the _ARRAY_DIMENSIONS attribute of a variable, split once per path."""
+        if path in self._dimension_names:
+            return self._dimension_names[path]
+
+        dim_names = None
+        dimension_variable = self._find_direct_children_in_store(path).get(DIMENSION_KEY)
+        if dimension_variable is not None:
+            dimension_reader = self._reader_for(dimension_variable)
+            if dimension_reader.is_scalar:
+                value = dimension_reader.get_scalar()
+                if isinstance(value, str):
+                    # Dimensions are stored as a comma-separated string, split them
+                    dim_names = tuple(value.split(','))
+                elif isinstance(value, list):
+                    dim_names = tuple(value)
+        self._dimension_names[path] = dim_names
+        return dim_names
 
     def _get_known_dimensions(self):
         """
         Get a set of all dimension names used in the dataset.
-        This scans all variables for their _ARRAY_DIMENSIONS attribute.
+        This scans all array variables for their _ARRAY_DIMENSIONS attribute once,
+        later calls return the cached result.
         """
+        if self._known_dimensions is not None:
+            return self._known_dimensions
+
         dimensions = set()
 
-        # Scan all variables for dimension names
-        for var_key in self.variables_store:
-            var = self.variables_store[var_key]
-            reader = self.root_variable.init_from_variable(var)
-            if reader is None or reader.is_group or reader.is_scalar:
+        # Only variables with a _ARRAY_DIMENSIONS child can name dimensions. Look them
+        # up in the parent index, so no reader is opened for the other variables
+        for var_key, children in self._children_by_parent.items():
+            dimension_variable = children.get(DIMENSION_KEY)
+            var = self.variables_store.get(var_key)
+            if dimension_variable is None or var is None:
+                continue
+            reader = self._reader_for(var)
+            if reader.is_group or reader.is_scalar:
                 continue
 
-            attrs = self._get_attributes_for_variable(reader, var_key)
-            if DIMENSION_KEY in attrs:
-                dim_names = attrs[DIMENSION_KEY]
-                if isinstance(dim_names, str):
-                    dimensions.update(dim_names.split(','))
-                elif isinstance(dim_names, list):
-                    dimensions.update(dim_names)
+            dim_names = self._get_dimension_names(var_key)
+            if dim_names is not None:
+                dimensions.update(dim_names)
 
+        self._known_dimensions = dimensions
         return dimensions
 
     def _get_datasets_for_variable(self, reader: OmFilePyReader):
@@ -103,28 +185,28 @@ class OmDataStore(WritableCFDataStore):
         direct_children = self._find_direct_children_in_store("")
 
         for k, variable in direct_children.items():
-            child_reader = reader.init_from_variable(variable)
+            if k in self._drop_variables:
+                continue
+            child_reader = self._reader_for(variable)
             if not (child_reader.is_scalar or child_reader.is_group):
                 # This is an array variable
                 backend_array = OmBackendArray(reader=child_reader)
-                shape = backend_array.reader.shape
+                shape = backend_array.shape
 
-                # Get attributes to check for dimension information
+                # Get the attributes of the variable, the dimension names are handled below
                 attrs = self._get_attributes_for_variable(child_reader, k)
                 attrs_for_var = {attr_k: attr_v for attr_k, attr_v in attrs.items() if attr_k != DIMENSION_KEY}
 
                 # Look for dimension names in the _ARRAY_DIMENSIONS attribute
-                if DIMENSION_KEY in attrs:
-                    dim_names = attrs[DIMENSION_KEY]
-                    if isinstance(dim_names, str):
-                        # Dimensions are stored as a comma-separated string, split them
-                        dim_names = dim_names.split(',')
+                known_dim_names = self._get_dimension_names(k)
+                if known_dim_names is not None:
+                    dim_names = list(known_dim_names)
                 else:
                     # Default to generic dimension names if not specified
-                    dim_names = [f"dim{i}" for i in range(len(shape))]
+                    dim_names = _default_dimension_names(len(shape))
 
                 # Check if this variable is itself a dimension variable
-                variable_name = k.split('/')[-1]  # Get the actual name without parent path
+                variable_name = k.rpartition('/')[2]  # Get the actual name without parent path
 
                 # If this variable is a 1D array and its name matches a dimension name, use its own name
                 if len(shape) == 1 and variable_name in self._get_known_dimensions():
@@ -136,25 +218,106 @@ class OmDataStore(WritableCFDataStore):
         return datasets
 
     def close(self):
+        # All readers share the backend of the root reader, which is only released
+        # when the last of them is closed. Close the children first.
+        for reader in self._reader_cache.values():
+            reader.close()
+        self._reader_cache.clear()
+        self._attrs_cache.clear()
+        self._dimension_names.clear()
         self.root_variable.close()
 
 
 class OmBackendArray(BackendArray):
     def __init__(self, reader: OmFilePyReader):
         self.reader = reader
+        # xarray reads shape and dtype many times while indexing, each reader access
+        # crosses into Rust and builds a new list, so read them once
+        self._shape = tuple(reader.shape)
+        self._dtype = reader.dtype
 
     @property
     def shape(self):
-        return self.reader.shape
+        return self._shape
 
     @property
     def dtype(self):
-        return self.reader.dtype
+        return self._dtype
 
     def __getitem__(self, key: indexing.ExplicitIndexer) -> np.typing.ArrayLike:
+        # Plain ints and unit step slices are read by the Rust reader as they are,
+        # skip the normalization of explicit_indexing_adapter for them
+        if type(key) is indexing.BasicIndexer:
+            index = key.tuple
+            if all(type(k) is int or (type(k) is slice and k.step in (None, 1)) for k in index):
+                return self._read_outer(index)
         return indexing.explicit_indexing_adapter(
             key,
             self.shape,
-            indexing.IndexingSupport.BASIC,
-            self.reader.__getitem__,
+            indexing.IndexingSupport.OUTER,
+            self._read_outer,
         )
+
+    def _read_outer(self, key: tuple) -> np.ndarray:
+        """
+        Read an outer indexer of ints, positive step slices and sorted integer arrays.
+        The reader only supports ints and unit step slices, so every array is split
+        into runs of nearby indices that are read one by one into the output.
+        """
+        out_shape = []
+        runs_per_axis = []
+        for k, size in zip(key, self._shape):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(size)
+                n = len(range(start, stop, step))
+                out_shape.append(n)
+                # read the range covering the slice and apply its step afterwards
+                local = slice(None, None, step) if step != 1 else None
+                runs_per_axis.append([(slice(start, start + (n - 1) * step + 1), slice(0, n), local)])
+            elif isinstance(k, np.ndarray):
+                out_shape.append(k.size)
+                runs_per_axis.append(_index_runs(k))
+            else:
+                runs_per_axis.append([(int(k), None, None)])
+
+        out = np.empty(out_shape, dtype=self._dtype)
+        if out.size == 0:
+            return out
+
+        for runs in itertools.product(*runs_per_axis):
+            read_key = tuple(src for src, _, _ in runs)
+            # the reader squeezes singleton dimensions, restore them
+            read_shape = tuple(src.stop - src.start for src, dst, _ in runs if dst is not None)
+            data = np.reshape(self.reader[read_key], read_shape)
+            axis = 0
+            for _, dst, local in runs:
+                if dst is None:
+                    continue
+                if local is not None:
+                    data = data[(slice(None),) * axis + (local,)]
+                axis += 1
+            out[tuple(dst for _, dst, _ in runs if dst is not None)] = data
+        return out
+
+
+@lru_cache(maxsize=None)
+def _default_dimension_names(ndim: int) -> tuple[str, ...]:
+    """Get the generic dimension names dim0, dim1, ... for an array with ndim dimensions."""
+    return tuple(f"dim{i}" for i in range(ndim))
+
+
+def _index_runs(index: np.ndarray) -> list[tuple[slice, slice, Optional[np.ndarray]]]:
+    """
+    Split a sorted integer array into runs that are at most MAX_RUN_GAP apart.
+    Each run is (slice to read, slice of the output, indices into the read values).
+    """
+    breaks = np.flatnonzero(np.diff(index) > MAX_RUN_GAP) + 1
+    bounds = np.concatenate(([0], breaks, [index.size]))
+    runs = []
+    for i, j in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        run = index[i:j]
+        start, stop = int(run[0]), int(run[-1]) + 1
+        # a run without gaps or duplicates is used as it is
+        local = None if stop - start == run.size else run - start
+        runs.append((slice(start, stop), slice(i, j), local))
+    return runs
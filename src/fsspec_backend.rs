@@ -1,28 +1,89 @@
 use omfiles_rs::backend::backends::OmFileReaderBackend;
 use pyo3::prelude::*;
+use pyo3::types::{IntoPyDict, PyBytes};
 use pyo3::Python;
 use std::error::Error;
 
+/// Reads of at least this many bytes are split into concurrent range requests.
+const PARALLEL_READ_THRESHOLD: u64 = 16 * 1024 * 1024;
+/// Target size of each range request of a split read.
+const PARALLEL_READ_PART_SIZE: u64 = 8 * 1024 * 1024;
+/// A single connection to object storage tops out well below the available
+/// bandwidth, but too many concurrent requests just queue up.
+const MAX_PARALLEL_READS: u64 = 8;
+
 pub struct FsSpecBackend {
     py_file: PyObject,
+    fs: PyObject,
+    path: PyObject,
     file_size: u64,
 }
 
+/// Split the byte range `offset..offset + count` into at most
+/// `MAX_PARALLEL_READS` contiguous parts of roughly equal size.
+fn split_range(offset: u64, count: u64) -> Vec<(u64, u64)> {
+    let parts = count
+        .div_ceil(PARALLEL_READ_PART_SIZE)
+        .clamp(1, MAX_PARALLEL_READS);
+    let part_size = count.div_ceil(parts);
+    (0..parts)
+        .map(|i| {
+            let start = offset + i * part_size;
+            let end = (start + part_size).min(offset + count);
+            (start, end)
+        })
+        .filter(|(start, end)| start < end)
+        .collect()
+}
+
 impl FsSpecBackend {
     pub fn new(open_file: PyObject) -> PyResult<Self> {
-        let size = Python::with_gil(|py| -> PyResult<u64> {
+        let (fs, path, size) = Python::with_gil(|py| -> PyResult<(PyObject, PyObject, u64)> {
             let fs = open_file.bind(py).getattr("fs")?;
             let path = open_file.bind(py).getattr("path")?;
-            let size = fs.call_method1("size", (path,))?.extract::<u64>()?;
-            Ok(size)
+            let size = fs.call_method1("size", (&path,))?.extract::<u64>()?;
+            Ok((fs.unbind(), path.unbind(), size))
         })?;
 
         Ok(Self {
             py_file: open_file.into(),
+            fs,
+            path,
             file_size: size,
         })
     }
 
+    /// Read a large byte range with concurrent range requests. For async file
+    /// systems like s3fs, `cat_ranges` issues all requests at once.
+    fn get_bytes_split(&self, py: Python<'_>, offset: u64, count: u64) -> PyResult<Vec<u8>> {
+        let ranges = split_range(offset, count);
+        let paths = vec![self.path.clone_ref(py); ranges.len()];
+        let starts: Vec<u64> = ranges.iter().map(|(start, _)| *start).collect();
+        let ends: Vec<u64> = ranges.iter().map(|(_, end)| *end).collect();
+
+        // By default a failed range is returned as an exception object in the list,
+        // raise it instead so the real I/O error reaches the caller
+        let kwargs = [("on_error", "raise")].into_py_dict(py)?;
+        let parts = self.fs.bind(py).call_method(
+            "cat_ranges",
+            (paths, starts, ends),
+            Some(&kwargs),
+        )?;
+        let mut bytes = Vec::with_capacity(count as usize);
+        for part in parts.try_iter()? {
+            bytes.extend_from_slice(part?.downcast::<PyBytes>()?.as_bytes());
+        }
+        if bytes.len() as u64 != count {
+            return Err(PyErr::new::<pyo3::exceptions::PyIOError, _>(format!(
+                "Short read: expected {} bytes at offset {}, got {}",
+                count,
+                offset,
+                bytes.len()
+            )));
+        }
+        Ok(bytes)
+    }
+
     pub fn close(&self) -> PyResult<()> {
         Python::with_gil(|py| {
             let file_obj = &self.py_file;
@@ -61,6 +122,10 @@ impl OmFileReaderBackend for FsSpecBackend {
         count: u64,
     ) -> Result<Vec<u8>, omfiles_rs::errors::OmFilesRsError> {
         let bytes = Python::with_gil(|py| -> Result<Vec<u8>, Box<dyn Error>> {
+            if count >= PARALLEL_READ_THRESHOLD {
+                return Ok(self.get_bytes_split(py, offset, count)?);
+            }
+
             // Seek to offset
             self.py_file.call_method1(py, "seek", (offset,))?;
 
@@ -114,4 +179,24 @@ mod tests {
 
         Ok(())
     }
+
+    #[test]
+    fn test_split_range() {
+        // Small reads stay in one piece
+        assert_eq!(split_range(10, 100), vec![(10, 110)]);
+
+        // 20 MiB are split into three parts of at most 8 MiB
+        let count = 20 * 1024 * 1024;
+        let ranges = split_range(5, count);
+        assert_eq!(ranges.len(), 3);
+        assert_eq!(ranges.first().unwrap().0, 5);
+        assert_eq!(ranges.last().unwrap().1, 5 + count);
+        assert!(ranges.windows(2).all(|w| w[0].1 == w[1].0));
+
+        // Very large reads are capped at MAX_PARALLEL_READS parts
+        let count = 1024 * 1024 * 1024;
+        let ranges = split_range(0, count);
+        assert_eq!(ranges.len() as u64, MAX_PARALLEL_READS);
+        assert_eq!(ranges.last().unwrap().1, count);
+    }
 }
@@ -136,11 +136,12 @@ impl OmFilePyReader {
     #[pyo3(signature = (_exc_type=None, _exc_value=None, _traceback=None))]
     fn __exit__(
         &self,
+        py: Python<'_>,
         _exc_type: Option<PyObject>,
         _exc_value: Option<PyObject>,
         _traceback: Option<PyObject>,
     ) -> PyResult<bool> {
-        self.close()?;
+        self.close(py)?;
         Ok(false)
     }
 
@@ -153,14 +154,20 @@ impl OmFilePyReader {
         Ok(guard.is_none())
     }
 
-    fn close(&self) -> PyResult<()> {
-        // Need write access to take the reader
-        let mut guard = self.reader.try_write().map_err(|e| {
-            PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(format!("Lock error: {}", e))
-        })?;
+    fn close(&self, py: Python<'_>) -> PyResult<()> {
+        // Need write access to take the reader. Reads release the GIL while they
+        // hold the read lock, so wait for them to finish without holding the GIL.
+        let taken = py
+            .allow_threads(|| -> Result<TakenReader, String> {
+                let mut guard = self.reader.write().map_err(|e| e.to_string())?;
+                // takes the reader, leaving None in the RwLock
+                Ok(TakenReader(guard.take()))
+            })
+            .map_err(|e| {
+                PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(format!("Lock error: {}", e))
+            })?;
 
-        // takes the reader, leaving None in the RwLock
-        if let Some(reader) = guard.take() {
+        if let Some(reader) = taken.0 {
             // Extract the backend before dropping reader
             if let Ok(backend) = Arc::try_unwrap(reader.backend) {
                 match backend {
@@ -306,13 +313,41 @@ impl OmFilePyReader {
     }
 }
 
-fn read_untyped_array<'py, T: Element + OmFileArrayDataType + Clone + Zero>(
-    reader: &OmFileReader<impl OmFileReaderBackend>,
+/// Wrapper to move a borrowed reader into `Python::allow_threads`.
+///
+/// Only the backends of `OmFilePyReader` are supported, see the safety comment below.
+struct UngilReader<'a>(&'a OmFileReader<BackendImpl>);
+
+// SAFETY: `UngilReader` is only created from the reader borrowed by `with_reader`,
+// which holds the read guard of `OmFilePyReader::reader` until the closure that
+// releases the GIL has returned. `close` has to take the write lock to take the
+// reader out, and waits for that guard, so the reader cannot be dropped while it is
+// used without the GIL. Several threads may share the reader at the same time:
+// the mmap backend only reads from a read-only mapping, and the fsspec backend
+// takes the GIL back before each call into Python.
+unsafe impl Send for UngilReader<'_> {}
+
+/// The reader taken out of the lock by `close`, moved out of `Python::allow_threads`.
+struct TakenReader(Option<OmFileReader<BackendImpl>>);
+
+// SAFETY: the reader is owned and moved out of the write lock, no other thread can
+// reach it anymore. The closure returns it to the thread that called `close`.
+unsafe impl Send for TakenReader {}
+
+fn read_untyped_array<'py, T: Element + OmFileArrayDataType + Clone + Zero + Send>(
+    reader: &OmFileReader<BackendImpl>,
     read_ranges: Vec<std::ops::Range<u64>>,
     py: Python<'py>,
 ) -> PyResult<Bound<'py, PyUntypedArray>> {
-    let array = reader
-        .read::<T>(&read_ranges, None, None)
+    // Decoding does not touch Python objects, so release the GIL while it runs and
+    // let other Python threads continue. The fsspec backend takes the GIL back for
+    // each of its reads.
+    let ungil_reader = UngilReader(reader);
+    let array = py
+        .allow_threads(move || {
+            let reader = ungil_reader;
+            reader.0.read::<T>(&read_ranges, None, None)
+        })
         .map_err(convert_omfilesrs_error)?;
     // We only add dimensions that are no singleton dimensions to the output shape
     // This is basically a dimensional squeeze and it is the same behavior as numpy
@@ -16,6 +16,30 @@ use omfiles_rs::{
 use pyo3::{exceptions::PyValueError, prelude::*};
 use std::{fs::File, sync::Mutex};
 
+/// Default capacity of the in-memory write buffer in bytes.
+const DEFAULT_BUFFER_CAPACITY: u64 = 8 * 1024;
+
+/// Reserve `size` bytes of disk space for the file without changing its length,
+/// so the trailer still ends up at the end of the written data.
+#[cfg(target_os = "linux")]
+fn preallocate_file(file: &File, size: u64) -> std::io::Result<()> {
+    use std::os::unix::io::AsRawFd;
+
+    let size = libc::off_t::try_from(size)
+        .map_err(|_| std::io::Error::from(std::io::ErrorKind::InvalidInput))?;
+    let ret = unsafe { libc::fallocate(file.as_raw_fd(), libc::FALLOC_FL_KEEP_SIZE, 0, size) };
+    if ret == 0 {
+        Ok(())
+    } else {
+        Err(std::io::Error::last_os_error())
+    }
+}
+
+#[cfg(not(target_os = "linux"))]
+fn preallocate_file(_file: &File, _size: u64) -> std::io::Result<()> {
+    Ok(())
+}
+
 #[pyclass]
 pub struct OmFilePyWriter {
     file_writer: Mutex<Option<OmFileWriter<File>>>,
@@ -24,9 +48,30 @@ pub struct OmFilePyWriter {
 #[pymethods]
 impl OmFilePyWriter {
     #[new]
-    fn new(file_path: &str) -> PyResult<Self> {
+    #[pyo3(
+            text_signature = "(file_path, buffer_capacity=8192, preallocate=None)",
+            signature = (file_path, buffer_capacity=None, preallocate=None)
+        )]
+    fn new(file_path: &str, buffer_capacity: Option<u64>, preallocate: Option<u64>) -> PyResult<Self> {
+        // Compressed chunks are collected in this buffer and flushed to the file
+        // in large writes. A bigger buffer batches many small chunks per syscall.
+        let buffer_capacity = buffer_capacity.unwrap_or(DEFAULT_BUFFER_CAPACITY);
+        if buffer_capacity == 0 {
+            return Err(PyValueError::new_err("buffer_capacity must be positive"));
+        }
         let file_handle = File::create(file_path)?;
-        let writer = OmFileWriter::new(file_handle, 8 * 1024); // initial capacity of 8KB
+        if let Some(size) = preallocate {
+            // Reserving the expected size up front lets the file system allocate
+            // contiguous extents once, instead of growing the file on every flush.
+            // It is only a hint, so file systems without support are not an error.
+            let _ = preallocate_file(&file_handle, size);
+        }
+        let writer = OmFileWriter::new(
+            file_handle,
+            buffer_capacity
+                .try_into()
+                .map_err(|_| PyValueError::new_err("buffer_capacity is too large"))?,
+        );
         Ok(Self {
             file_writer: Mutex::new(Some(writer)),
         })
@@ -301,7 +346,7 @@ mod tests {
             let data = ArrayD::from_shape_fn(dimensions, |idx| (idx[0] + idx[1]) as f32);
             let py_array = PyArrayDyn::from_array(py, &data);
 
-            let mut file_writer = OmFilePyWriter::new(file_path).unwrap();
+            let mut file_writer = OmFilePyWriter::new(file_path, None, None).unwrap();
 
             // Write data
             let result = file_writer.write_array(
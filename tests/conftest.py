@@ -1,17 +1,48 @@
+import gc
 import os
 import tempfile
 
+import fsspec
+import fsspec.asyn
 import numpy as np
 import numpy.typing as npt
 import pytest
+from omfiles import OmFilePyWriter
 
-from .test_utils import create_test_om_file
+from .test_utils import TEST_DTYPES, count_open_files, create_test_om_file
 
+# Keep the temporary test files in memory where a tmpfs is available, so the
+# tests do not pay for writes to persistent storage
+TEMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+# descriptors pytest itself may open during the session, like its cache
+SESSION_FD_TOLERANCE = 2
 
-@pytest.fixture
+
+@pytest.fixture(autouse=True, scope="session")
+def file_leak_guard():
+    """
+    Fixture that fails the session if the tests leave file descriptors open.
+    Cached fsspec file systems keep their connections open on purpose, so their
+    instances are cleared and the garbage is collected once before counting.
+    The IO loop thread of fsspec lives as long as the process, so it is started
+    before the baseline is taken and its descriptors are not counted as a leak.
+    """
+    fsspec.asyn.get_loop()
+    fds_before = count_open_files()
+    yield
+    fsspec.AbstractFileSystem.clear_instance_cache()
+    gc.collect()
+    fds_after = count_open_files()
+    assert fds_after <= fds_before + SESSION_FD_TOLERANCE, (
+        f"File descriptor leak across the session: {fds_before} before, {fds_after} after"
+    )
+
+
+@pytest.fixture(scope="session")
 def temp_om_file():
     """
     Fixture that creates a temporary OM file filled with some data.
+    The file is only read by the tests, so it is created once per session.
     Returns a path to the temporary file.
     """
 
@@ -20,7 +51,7 @@ def temp_om_file():
 
     # On Windows a file cannot be opened twice, so we need to close it first
     # and take care of deleting it ourselves
-    with tempfile.NamedTemporaryFile(suffix=".om", delete=False) as temp_file:
+    with tempfile.NamedTemporaryFile(suffix=".om", delete=False, dir=TEMP_DIR) as temp_file:
         create_test_om_file(temp_file.name, shape=shape, dtype=dtype)
         temp_file.close()
         filename = temp_file.name
@@ -34,6 +65,27 @@ def temp_om_file():
             import warnings
             warnings.warn(f"Failed to remove temporary file {filename}: {e}")
 
+@pytest.fixture(scope="session")
+def dtypes_om_file(tmp_path_factory):
+    """
+    Fixture that creates an OM file with one (5, 5) array per dtype in TEST_DTYPES.
+    The arrays are children of the group "dtypes" and named after their dtype,
+    all of them are written once per session.
+    Returns a path to the file.
+    """
+    filename = str(tmp_path_factory.mktemp("om") / "dtypes.om")
+
+    writer = OmFilePyWriter(filename)
+    variables = [
+        writer.write_array(np.arange(25, dtype=dtype).reshape(5, 5), chunks=[5, 5], name=np.dtype(dtype).name)
+        for dtype in TEST_DTYPES
+    ]
+    group = writer.write_group("dtypes", variables)
+    writer.close(group)
+
+    return filename
+
+
 @pytest.fixture
 def empty_temp_om_file():
     """
@@ -43,7 +95,7 @@ def empty_temp_om_file():
 
     # On Windows a file cannot be opened twice, so we need to close it first
     # and take care of deleting it ourselves
-    with tempfile.NamedTemporaryFile(suffix=".om", delete=False) as temp_file:
+    with tempfile.NamedTemporaryFile(suffix=".om", delete=False, dir=TEMP_DIR) as temp_file:
         temp_file.close()
         filename = temp_file.name
 
@@ -5,20 +5,22 @@ import omfiles
 import pytest
 import xarray as xr
 
-from .test_utils import filter_numpy_size_warning
-
 
 @pytest.fixture
 def s3_backend():
     s3_test_file = "openmeteo/data/dwd_icon_d2/temperature_2m/chunk_3960.om"
     fs = fsspec.filesystem("s3", anon=True)
-    yield fs.open(s3_test_file, mode="rb")
+    with fs.open(s3_test_file, mode="rb") as f:
+        yield f
 
 @pytest.fixture
 def s3_backend_with_cache():
     s3_test_file = "openmeteo/data/dwd_icon_d2/temperature_2m/chunk_3960.om"
     fs = fsspec.filesystem(protocol="s3", anon=True)
-    yield fs.open(s3_test_file, mode="rb", cache_type="mmap", block_size=1024, cache_options={"location": "cache"})
+    with fs.open(
+        s3_test_file, mode="rb", cache_type="mmap", block_size=1024, cache_options={"location": "cache"}
+    ) as f:
+        yield f
 
 
 def test_s3_reader(s3_backend):
@@ -37,7 +39,6 @@ def test_s3_reader_with_cache(s3_backend_with_cache):
     np.testing.assert_array_almost_equal(data[:10], expected)
 
 
-@filter_numpy_size_warning
 @pytest.mark.xfail(reason="Om Files on S3 currently have no names assigned for the variables")
 def test_s3_xarray(s3_backend_with_cache):
     ds = xr.open_dataset(s3_backend_with_cache, engine="om")
@@ -109,3 +110,21 @@ def test_fsspec_file_actually_closes(temp_om_file):
         assert False, "File should be closed"
     except (ValueError, OSError):
         pass
+
+
+def test_fsspec_large_read(empty_temp_om_file):
+    """Test a read that is large enough to be split into concurrent range requests."""
+    # a single chunk that compresses to well above the 16 MiB split threshold
+    rng = np.random.default_rng(0)
+    data = rng.random((4096, 4096), dtype=np.float32)
+
+    writer = omfiles.OmFilePyWriter(empty_temp_om_file)
+    variable = writer.write_array(data, chunks=[4096, 4096], scale_factor=10000.0)
+    writer.close(variable)
+
+    fs = fsspec.filesystem("file")
+    with fs.open(empty_temp_om_file, "rb") as f:
+        with omfiles.OmFilePyReader(f) as reader:
+            read_data = reader[:]
+
+    np.testing.assert_array_almost_equal(read_data, data, decimal=4)
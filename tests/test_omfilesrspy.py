@@ -1,4 +1,6 @@
+import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import omfiles
@@ -189,3 +191,67 @@ def test_reader_close(temp_om_file):
             [20.0, 21.0, 22.0, 23.0, 24.0],
         ],
     )
+
+
+def test_concurrent_reads(empty_temp_om_file):
+    data = np.arange(256 * 256, dtype=np.float32).reshape(256, 256)
+    writer = omfiles.OmFilePyWriter(empty_temp_om_file)
+    variable = writer.write_array(data, chunks=[16, 16])
+    writer.close(variable)
+
+    reader = omfiles.OmFilePyReader(empty_temp_om_file)
+
+    # Reads release the GIL, several threads can decode at the same time
+    def read_rows(start):
+        return start, reader[start : start + 32, :]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for start, rows in executor.map(read_rows, range(0, 256, 32)):
+            np.testing.assert_array_equal(rows, data[start : start + 32])
+
+    # Closing while reads are running waits for them, later reads fail as closed
+    def read_until_closed(_):
+        try:
+            while True:
+                _ = reader[:, :]
+        except ValueError:
+            pass
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(read_until_closed, i) for i in range(4)]
+        reader.close()
+        for future in futures:
+            future.result()
+    assert reader.closed
+
+
+def test_write_with_buffer_capacity(empty_temp_om_file):
+    data = np.arange(100 * 100, dtype=np.float32).reshape(100, 100)
+
+    # A tiny buffer forces many flushes, a large one batches all chunks
+    for buffer_capacity in [256, 1024 * 1024]:
+        writer = omfiles.OmFilePyWriter(empty_temp_om_file, buffer_capacity=buffer_capacity)
+        variable = writer.write_array(data, chunks=[10, 10])
+        writer.close(variable)
+
+        with omfiles.OmFilePyReader(empty_temp_om_file) as reader:
+            np.testing.assert_array_equal(reader[:], data)
+
+    try:
+        omfiles.OmFilePyWriter(empty_temp_om_file, buffer_capacity=0)
+        assert False, "Expecting an error for a zero buffer capacity"
+    except ValueError:
+        pass
+
+
+def test_write_with_preallocate(empty_temp_om_file):
+    data = np.arange(100 * 100, dtype=np.float32).reshape(100, 100)
+
+    # Reserving more space than needed must not change the file content or size
+    writer = omfiles.OmFilePyWriter(empty_temp_om_file, preallocate=data.nbytes * 2)
+    variable = writer.write_array(data, chunks=[10, 10])
+    writer.close(variable)
+
+    assert os.path.getsize(empty_temp_om_file) < data.nbytes * 2
+    with omfiles.OmFilePyReader(empty_temp_om_file) as reader:
+        np.testing.assert_array_equal(reader[:], data)
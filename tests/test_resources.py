@@ -1,22 +1,27 @@
+import os
+
 import fsspec
 import omfiles
 
 from .test_utils import FileDescriptorCounter
 
+# A leak shows up after the second open already, set OMFILES_STRESS_N for more cycles
+LEAK_CYCLES = int(os.environ.get("OMFILES_STRESS_N", "2"))
+
 
 def test_no_file_handle_leaks(temp_om_file):
     file_descriptor_counter = FileDescriptorCounter()
     file_descriptor_counter.count_before()
 
     # Create and use multiple readers
-    for _ in range(10):  # Open and close multiple times
+    for _ in range(LEAK_CYCLES):  # Open and close multiple times
         reader = omfiles.OmFilePyReader(temp_om_file)
         _ = reader[0:5, 0:5]
         reader.close()
 
     # Also test with fsspec
     fs = fsspec.filesystem("file")
-    for _ in range(10):
+    for _ in range(LEAK_CYCLES):
         with fs.open(temp_om_file, "rb") as f:
             reader = omfiles.OmFilePyReader(f)
             _ = reader[0:5, 0:5]
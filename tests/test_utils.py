@@ -1,9 +1,6 @@
 from __future__ import annotations
 
-import functools
-import gc
 import os
-import warnings
 
 import numpy as np
 import numpy.typing as npt
@@ -11,8 +8,27 @@ import psutil
 from omfiles import OmFilePyWriter
 
 
+TEST_DTYPES = [
+    np.int8, np.uint8, np.int16, np.uint16, np.int32,
+    np.uint32, np.int64, np.uint64, np.float32, np.float64
+]
+
+_TEST_DATA: dict[tuple, np.ndarray] = {}
+
+
+def _test_data(shape, dtype: npt.DTypeLike) -> np.ndarray:
+    """Get the read-only test array of a shape and dtype, created once per session."""
+    key = (tuple(shape), np.dtype(dtype).str)
+    test_data = _TEST_DATA.get(key)
+    if test_data is None:
+        test_data = np.arange(int(np.prod(shape)), dtype=dtype).reshape(shape)
+        test_data.setflags(write=False)
+        _TEST_DATA[key] = test_data
+    return test_data
+
+
 def create_test_om_file(filename: str = "test_file.om", shape=(5, 5), dtype: npt.DTypeLike =np.float32) -> tuple[str, np.ndarray]:
-    test_data = np.arange(np.prod(shape), dtype=dtype).reshape(shape)
+    test_data = _test_data(shape, dtype)
 
     writer = OmFilePyWriter(filename)
     variable = writer.write_array(test_data, chunks=[5, 5])
@@ -21,36 +37,33 @@ def create_test_om_file(filename: str = "test_file.om", shape=(5, 5), dtype: npt
     return filename, test_data
 
 
-def filter_numpy_size_warning(func):
-    """
-    Decorator to filter out numpy size changed warnings.
+# Listing the fd directory is a single getdents call, psutil.Process.open_files
+# reads the link and stats every descriptor
+_FD_DIR = "/proc/self/fd"
+_PROCESS = psutil.Process(os.getpid())
+
 
-    for some reason xr.open_dataset triggers a warning:
-    "RuntimeWarning: numpy.ndarray size changed, may indicate binary incompatibility. Expected 16 from C header, got 96 from PyObject"
-    We will just filter it out for now...
-    https://github.com/pydata/xarray/issues/7259
-    """
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", message="numpy.ndarray size changed", category=RuntimeWarning)
-            return func(*args, **kwargs)
-    return wrapper
+def count_open_files() -> int:
+    """Count the open file descriptors (handles on Windows) of this process."""
+    if os.path.isdir(_FD_DIR):
+        return len(os.listdir(_FD_DIR))
+    if hasattr(_PROCESS, "num_handles"):
+        return _PROCESS.num_handles()
+    return _PROCESS.num_fds()
 
 
 class FileDescriptorCounter:
     def __init__(self):
-        self.process = psutil.Process(os.getpid())
         self.fd_count_before = 0
 
     def count_before(self):
-        self.fd_count_before = len(self.process.open_files())
+        self.fd_count_before = count_open_files()
         return self.fd_count_before
 
     def count_after(self):
-        # Clean up potentially lingering objects
-        gc.collect()
-        return len(self.process.open_files())
+        # Readers release their file when closed or when their last reference is
+        # dropped, a full garbage collection would only hide readers kept alive
+        return count_open_files()
 
     def assert_no_leaks(self):
         fd_count_after = self.count_after()
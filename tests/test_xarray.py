@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import numpy as np
 import omfiles.omfiles as om
 import omfiles.xarray_backend as om_xarray
@@ -5,57 +7,110 @@ import pytest
 import xarray as xr
 from xarray.core import indexing
 
-from .test_utils import create_test_om_file, filter_numpy_size_warning
+from .test_utils import TEST_DTYPES
 
-test_dtypes = [
-    np.int8, np.uint8, np.int16, np.uint16, np.int32,
-    np.uint32, np.int64, np.uint64, np.float32, np.float64
-]
+# the data of temp_om_file
+EXPECTED_DATA = np.arange(25, dtype=np.float32).reshape(5, 5)
 
-@pytest.mark.parametrize('dtype', test_dtypes, ids=[f"{dtype.__name__}" for dtype in test_dtypes])
-def test_om_backend_xarray_dtype(dtype, empty_temp_om_file):
-    dtype = np.dtype(dtype)
 
-    create_test_om_file(empty_temp_om_file, shape=(5,5), dtype=dtype)
+@pytest.mark.parametrize('dtype', TEST_DTYPES, ids=[f"{dtype.__name__}" for dtype in TEST_DTYPES])
+def test_om_backend_xarray_dtype(dtype, dtypes_om_file):
+    dtype = np.dtype(dtype)
 
-    reader = om.OmFilePyReader(empty_temp_om_file)
+    root = om.OmFilePyReader(dtypes_om_file)
+    reader = root.init_from_variable(root.get_flat_variable_metadata()[f"dtypes/{dtype.name}"])
     backend_array = om_xarray.OmBackendArray(reader=reader)
 
     assert isinstance(backend_array.dtype, np.dtype)
     assert backend_array.dtype == dtype
 
+    reader.close()
+    root.close()
+
+
+def test_om_backend_xarray_lazy_dtype(dtypes_om_file):
+    # the dtype of the backend array reaches xarray without reading the data
+    root = om.OmFilePyReader(dtypes_om_file)
+    reader = root.init_from_variable(root.get_flat_variable_metadata()["dtypes/float32"])
+    backend_array = om_xarray.OmBackendArray(reader=reader)
+
     data = xr.Variable(dims=["x", "y"], data=indexing.LazilyIndexedArray(backend_array))
-    assert data.dtype == dtype
+    assert data.dtype == np.float32
 
     reader.close()
+    root.close()
+
+
+def test_guess_can_open():
+    entrypoint = om_xarray.OmXarrayEntrypoint()
+    assert entrypoint.guess_can_open("data.om")
+    assert entrypoint.guess_can_open(Path("data.om"))
+    assert not entrypoint.guess_can_open("data.nc")
+    assert not entrypoint.guess_can_open(b"data.om")
+    assert not entrypoint.guess_can_open(object())
 
 
-@filter_numpy_size_warning
 def test_xarray_backend(temp_om_file):
     ds = xr.open_dataset(temp_om_file, engine="om")
-    variable = ds["data"]
 
-    data = variable.values
+    data = ds["data"].to_numpy()
     assert data.shape == (5, 5)
     assert data.dtype == np.float32
-    np.testing.assert_array_equal(
-        data,
-        [
-            [0.0, 1.0, 2.0, 3.0, 4.0],
-            [5.0, 6.0, 7.0, 8.0, 9.0],
-            [10.0, 11.0, 12.0, 13.0, 14.0],
-            [15.0, 16.0, 17.0, 18.0, 19.0],
-            [20.0, 21.0, 22.0, 23.0, 24.0],
-        ],
-    )
+    np.testing.assert_array_equal(data, EXPECTED_DATA)
+
+
+def test_xarray_drop_variables(temp_om_file):
+    ds = xr.open_dataset(temp_om_file, engine="om", drop_variables=["data"])
+    assert "data" not in ds.variables
+
+    ds = xr.open_dataset(temp_om_file, engine="om", drop_variables="data")
+    assert "data" not in ds.variables
+
+
+def test_xarray_outer_indexing(temp_om_file):
+    ds = xr.open_dataset(temp_om_file, engine="om")
+    expected = EXPECTED_DATA
+
+    np.testing.assert_array_equal(ds["data"][0:1].values, expected[0:1])
+    np.testing.assert_array_equal(ds["data"][::2, ::-2].values, expected[::2, ::-2])
+    np.testing.assert_array_equal(ds["data"][[4, 0, 0], [1, 3]].values, expected[[4, 0, 0]][:, [1, 3]])
+    np.testing.assert_array_equal(ds["data"][[], 2].values, expected[[], 2])
+
+
+def test_xarray_close(temp_om_file):
+    ds = xr.open_dataset(temp_om_file, engine="om")
+    # the dataset still reads after open_dataset returned
+    assert ds["data"].values.shape == (5, 5)
+    ds.close()
+
+    with pytest.raises(ValueError):
+        _ = ds["data"].values
+
+
+def test_xarray_open_error_closes_readers(temp_om_file, monkeypatch):
+    child_readers = []
+
+    def failing_open_dataset(self, store, **kwargs):
+        # open the child readers like a successful open would, then fail
+        store.get_variables()
+        child_readers.extend(store._reader_cache.values())
+        raise RuntimeError("failed to build the dataset")
+
+    monkeypatch.setattr(om_xarray.StoreBackendEntrypoint, "open_dataset", failing_open_dataset)
+    with pytest.raises(RuntimeError):
+        xr.open_dataset(temp_om_file, engine="om")
+
+    assert child_readers
+    assert all(reader.closed for reader in child_readers)
+
 
-@filter_numpy_size_warning
 def test_xarray_hierarchical_file(empty_temp_om_file):
     # Create test data
+    rng = np.random.default_rng(0)
     # temperature: lat, lon, alt, time
-    temperature_data = np.random.rand(5, 5, 5, 10).astype(np.float32)
+    temperature_data = rng.random((5, 5, 5, 10), dtype=np.float32)
     # precipitation: lat, lon, time
-    precipitation_data = np.random.rand(5, 5, 10).astype(np.float32)
+    precipitation_data = rng.random((5, 5, 10), dtype=np.float32)
 
     # Write hierarchical structure
     writer = om.OmFilePyWriter(empty_temp_om_file)
@@ -89,10 +144,10 @@ def test_xarray_hierarchical_file(empty_temp_om_file):
     )
 
     # Write dimensions
-    lat = writer.write_array(name="LATITUDE", data=np.arange(5).astype(np.float32), chunks=[5])
-    lon = writer.write_array(name="LONGITUDE", data=np.arange(5).astype(np.float32), chunks=[5])
-    alt = writer.write_array(name="ALTITUDE", data=np.arange(5).astype(np.float32), chunks=[5])
-    time = writer.write_array(name="TIME", data=np.arange(10).astype(np.float32), chunks=[10])
+    lat = writer.write_array(name="LATITUDE", data=np.arange(5, dtype=np.float32), chunks=[5])
+    lon = writer.write_array(name="LONGITUDE", data=np.arange(5, dtype=np.float32), chunks=[5])
+    alt = writer.write_array(name="ALTITUDE", data=np.arange(5, dtype=np.float32), chunks=[5])
+    time = writer.write_array(name="TIME", data=np.arange(10, dtype=np.float32), chunks=[10])
 
     global_attr = writer.write_scalar("This is a hierarchical OM File", name="description")
 
@@ -152,3 +207,7 @@ def test_xarray_hierarchical_file(empty_temp_om_file):
     mean_temp = ds["temperature"].mean(dim="TIME")
     assert mean_temp.shape == (5, 5, 5)
     assert mean_temp.dims == ("LATITUDE", "LONGITUDE", "ALTITUDE")
+    # The values of the mean are checked on the raw data, independent of xarray
+    np.testing.assert_allclose(
+        ds["temperature"].to_numpy().mean(axis=3), temperature_data.mean(axis=3), atol=1e-4
+    )